@@ -46,5 +46,6 @@ class Config:
 
     # Trading Agent
     TRADING_AGENT_INTERVAL_SECONDS = int(os.getenv("TRADING_AGENT_INTERVAL_SECONDS", "14400"))
+    TRADING_AGENT_MAX_CONCURRENT_USERS = int(os.getenv("TRADING_AGENT_MAX_CONCURRENT_USERS", "8"))
 
 config = Config()
@@ -3,12 +3,15 @@ Database service for MongoDB operations.
 Handles users and swaps.
 """
 import logging
-from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReturnDocument, WriteConcern
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 from solana_agent_api.models import (
     user_document,
+    payment_request_document,
     paper_portfolio_document,
     paper_order_document,
     bot_thought_document,
@@ -17,10 +20,28 @@ from solana_agent_api.models import (
 
 logger = logging.getLogger(__name__)
 
+# One Motor client (and connection pool) per URI, shared by every DatabaseService
+_CLIENT_CACHE: dict[str, AsyncIOMotorClient] = {}
+
+
+def _get_client(mongo_url: str) -> AsyncIOMotorClient:
+    """Return the cached client for this URI, creating it on first use."""
+    client = _CLIENT_CACHE.get(mongo_url)
+    if client is None:
+        client = AsyncIOMotorClient(
+            mongo_url,
+            maxPoolSize=50,
+            minPoolSize=5,
+            maxIdleTimeMS=300_000,
+            serverSelectionTimeoutMS=5000,
+        )
+        _CLIENT_CACHE[mongo_url] = client
+    return client
+
 
 class DatabaseService:
     def __init__(self, mongo_url: str, database_name: str):
-        self.client = AsyncIOMotorClient(mongo_url)
+        self.client = _get_client(mongo_url)
         self.db: AsyncIOMotorDatabase = self.client[database_name]
         
         # Collections
@@ -33,6 +54,10 @@ class DatabaseService:
         self.bot_thoughts = self.db["bot_thoughts"]
         self.trend_changes = self.db["trend_changes"]
     
+    async def warmup(self):
+        """Ping the server so the connection pool is open before the first query."""
+        await self.client.admin.command("ping")
+
     async def setup_indexes(self):
         """Create necessary indexes for performance."""
         # Users indexes
@@ -41,6 +66,25 @@ class DatabaseService:
         await self.users.create_index("wallet_id")
         await self.users.create_index("user_id")
         await self.users.create_index("tg_user_id", sparse=True)
+        await self.users.create_index("tg_username_lower", sparse=True)
+
+        # One-time backfill of tg_username_lower for users created before it
+        # existed; null placeholders are unset so the sparse index skips them
+        migrations = self.db["migrations"]
+        if not await migrations.find_one({"_id": "tg_username_lower"}):
+            await self.users.update_many(
+                {"tg_username": {"$type": "string"}, "tg_username_lower": {"$exists": False}},
+                [{"$set": {"tg_username_lower": {"$toLower": "$tg_username"}}}],
+            )
+            await self.users.update_many(
+                {"tg_username_lower": {"$eq": None, "$exists": True}},
+                {"$unset": {"tg_username_lower": ""}},
+            )
+            await migrations.update_one(
+                {"_id": "tg_username_lower"},
+                {"$currentDate": {"applied_at": True}},
+                upsert=True,
+            )
         
         # Swaps indexes
         await self.swaps.create_index("tx_signature", unique=True)
@@ -53,24 +97,28 @@ class DatabaseService:
         await self.daily_volumes.create_index("date")
         
         # Paper orders indexes
-        await self.paper_orders.create_index("tg_user_id")
         await self.paper_orders.create_index("status")
         await self.paper_orders.create_index([("tg_user_id", 1), ("status", 1)])
         
         # Bot actions indexes
-        await self.bot_actions.create_index("tg_user_id")
         await self.bot_actions.create_index("timestamp")
         await self.bot_actions.create_index([("tg_user_id", 1), ("timestamp", -1)])
 
         # Bot thoughts indexes
-        await self.bot_thoughts.create_index("tg_user_id")
         await self.bot_thoughts.create_index("timestamp")
         await self.bot_thoughts.create_index([("tg_user_id", 1), ("timestamp", -1)])
 
         # Trend changes indexes
-        await self.trend_changes.create_index("tg_user_id")
         await self.trend_changes.create_index("timestamp")
         await self.trend_changes.create_index([("tg_user_id", 1), ("timestamp", -1)])
+
+        # Single-field tg_user_id indexes are prefixes of the compound indexes
+        # above, so drop them from existing deployments
+        for collection in (self.paper_orders, self.bot_actions, self.bot_thoughts, self.trend_changes):
+            try:
+                await collection.drop_index("tg_user_id_1")
+            except OperationFailure:
+                pass
         
         logger.info("Database indexes created")
 
@@ -95,10 +143,8 @@ class DatabaseService:
         # Remove @ if present
         username = username.lstrip('@')
         print(f"DEBUG: Looking up user by username: {username}")
-        # Case insensitive regex search
-        user = await self.users.find_one({
-            "tg_username": {"$regex": f"^{username}$", "$options": "i"}
-        })
+        # Indexed exact match on the pre-lowercased username
+        user = await self.users.find_one({"tg_username_lower": username.lower()})
         print(f"DEBUG: Lookup result: {user['wallet_address'] if user else 'None'}")
         return user
     
@@ -147,6 +193,7 @@ class DatabaseService:
         update_data = {"tg_user_id": tg_user_id}
         if tg_username:
             update_data["tg_username"] = tg_username
+            update_data["tg_username_lower"] = tg_username.lower()
             
         result = await self.users.update_one(
             {"privy_id": privy_id},
@@ -160,19 +207,15 @@ class DatabaseService:
         
     async def update_user_username(self, tg_user_id: int, tg_username: str) -> bool:
         """Update Telegram username for a user by TG ID."""
-        # Find user first to see if they exist
-        user = await self.users.find_one({"tg_user_id": tg_user_id})
-        if not user:
-            # Try to find by partial match or log warning?
-            # Actually, we might have users created by wallet address but not linked to TG ID yet? 
-            # (No, current flow requires TG ID for Privy ID creation usually).
-            print(f"DEBUG: Update username failed - User not found for TG ID: {tg_user_id}")
-            return False
-            
+        # Single round trip: matched_count tells us whether the user exists
         result = await self.users.update_one(
             {"tg_user_id": tg_user_id},
-            {"$set": {"tg_username": tg_username}}
+            {"$set": {"tg_username": tg_username, "tg_username_lower": tg_username.lower()}}
         )
+        if not result.matched_count:
+            print(f"DEBUG: Update username failed - User not found for TG ID: {tg_user_id}")
+            return False
+
         print(f"DEBUG: Updated username for {tg_user_id} to {tg_username}. Modified: {result.modified_count}")
         return result.modified_count > 0
     
@@ -186,38 +229,7 @@ class DatabaseService:
         tg_username: Optional[str] = None,
     ) -> dict:
         """Get existing user or create new one."""
-        user = await self.get_user_by_privy_id(privy_id)
-        if user:
-            # Update TG ID/Username if provided and not set or changed
-            update_data = {}
-            if tg_user_id and user.get("tg_user_id") != tg_user_id:
-                update_data["tg_user_id"] = tg_user_id
-            if tg_username and user.get("tg_username") != tg_username:
-                update_data["tg_username"] = tg_username
-            
-            # CRITICAL FIX: Update wallet address if it was missing but is now provided
-            if wallet_address and not user.get("wallet_address"):
-                update_data["wallet_address"] = wallet_address
-
-            # Update wallet ID if it was missing but is now provided
-            if wallet_id and not user.get("wallet_id"):
-                update_data["wallet_id"] = wallet_id
-
-            # Update Privy DID (user_id) if it was missing but is now provided
-            if user_id and not user.get("user_id"):
-                update_data["user_id"] = user_id
-                
-            if update_data:
-                await self.users.update_one(
-                    {"privy_id": privy_id},
-                    {"$set": update_data}
-                )
-                # Update local user object to reflect changes
-                user.update(update_data)
-                    
-            return user
-        
-        return await self.create_user(
+        user_doc = user_document(
             privy_id=privy_id,
             wallet_address=wallet_address,
             wallet_id=wallet_id,
@@ -225,6 +237,51 @@ class DatabaseService:
             tg_user_id=tg_user_id,
             tg_username=tg_username,
         )
+        user_doc["_id"] = ObjectId()
+
+        # Single upsert: returns the existing user, or None if this call inserted it
+        user = await self.users.find_one_and_update(
+            {"privy_id": privy_id},
+            {"$setOnInsert": {k: v for k, v in user_doc.items() if k != "privy_id"}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        if user is None:
+            logger.info(f"Created new user: {privy_id}")
+            return user_doc
+
+        # Update TG ID/Username if provided and not set or changed
+        update_data = {}
+        if tg_user_id and user.get("tg_user_id") != tg_user_id:
+            update_data["tg_user_id"] = tg_user_id
+        if tg_username and (
+            user.get("tg_username") != tg_username
+            or user.get("tg_username_lower") != tg_username.lower()
+        ):
+            update_data["tg_username"] = tg_username
+            update_data["tg_username_lower"] = tg_username.lower()
+        
+        # CRITICAL FIX: Update wallet address if it was missing but is now provided
+        if wallet_address and not user.get("wallet_address"):
+            update_data["wallet_address"] = wallet_address
+
+        # Update wallet ID if it was missing but is now provided
+        if wallet_id and not user.get("wallet_id"):
+            update_data["wallet_id"] = wallet_id
+
+        # Update Privy DID (user_id) if it was missing but is now provided
+        if user_id and not user.get("user_id"):
+            update_data["user_id"] = user_id
+            
+        if update_data:
+            await self.users.update_one(
+                {"privy_id": privy_id},
+                {"$set": update_data}
+            )
+            # Update local user object to reflect changes
+            user.update(update_data)
+
+        return user
 
     # =========================================================================
     # PAYMENT REQUEST OPERATIONS
@@ -240,36 +297,27 @@ class DatabaseService:
         is_private: bool = False,
     ) -> str:
         """Create a payment request and return its ID."""
-        from solana_agent_api.models import payment_request_document
-        
-        request = payment_request_document(
-            wallet_address=wallet_address,
-            token_mint=token_mint,
-            token_symbol=token_symbol,
-            amount=amount,
-            amount_usd=amount_usd,
-            is_private=is_private,
-        )
-        
-        # Ensure ID uniqueness (highly likely, but safe to check)
-        while await self.payment_requests.find_one({"_id": request["_id"]}):
+        while True:
             request = payment_request_document(
-                wallet_address,
-                token_mint,
-                token_symbol,
-                amount,
-                amount_usd,
-                is_private,
+                wallet_address=wallet_address,
+                token_mint=token_mint,
+                token_symbol=token_symbol,
+                amount=amount,
+                amount_usd=amount_usd,
+                is_private=is_private,
             )
-            
-        await self.payment_requests.insert_one(request)
-        return request["_id"]
+            # _id is unique, so a (very unlikely) ID collision surfaces here
+            try:
+                await self.payment_requests.insert_one(request)
+            except DuplicateKeyError:
+                continue
+            return request["_id"]
 
     async def mark_payment_request_sent(self, request_id: str):
         """Mark a payment request as sent."""
         await self.payment_requests.update_one(
             {"_id": request_id},
-            {"$set": {"status": "sent", "sent_at": datetime.utcnow()}}
+            {"$set": {"status": "sent"}, "$currentDate": {"sent_at": True}}
         )
 
     async def get_payment_request(self, request_id: str) -> Optional[dict]:
@@ -279,6 +327,37 @@ class DatabaseService:
         except Exception:
             return None
 
+    async def get_payment_request_with_recipient(self, request_id: str) -> Tuple[Optional[dict], Optional[dict]]:
+        """Get payment request by ID together with the recipient's tg_username, in one round trip.
+
+        Like get_payment_request, any database error is reported as (None, None).
+        """
+        try:
+            cursor = self.payment_requests.aggregate([
+                {"$match": {"_id": request_id}},
+                {"$lookup": {
+                    "from": "users",
+                    "localField": "wallet_address",
+                    "foreignField": "wallet_address",
+                    "as": "recipient",
+                }},
+                # Only the first match's username is displayed
+                {"$set": {"recipient": {"$map": {
+                    "input": {"$slice": ["$recipient", 1]},
+                    "as": "user",
+                    "in": {"tg_username": "$$user.tg_username"},
+                }}}},
+            ])
+            results = await cursor.to_list(length=1)
+        except Exception:
+            return None, None
+
+        if not results:
+            return None, None
+        request = results[0]
+        recipients = request.pop("recipient", [])
+        return request, (recipients[0] if recipients else None)
+
     # =========================================================================
     # TRADING AGENT OPERATIONS
     # =========================================================================
@@ -349,8 +428,9 @@ class DatabaseService:
         token_address: str,
         amount_usd: float,
         price_target_usd: float,
+        fill_price_usd: Optional[float] = None,
     ) -> dict:
-        """Create a paper trading order."""
+        """Create a paper trading order. Pass fill_price_usd to insert it already filled."""
         order = paper_order_document(
             tg_user_id=tg_user_id,
             action=action,
@@ -359,6 +439,10 @@ class DatabaseService:
             amount_usd=amount_usd,
             price_target_usd=price_target_usd,
         )
+        if fill_price_usd is not None:
+            order["status"] = "filled"
+            order["fill_price_usd"] = fill_price_usd
+            order["filled_at"] = order["created_at"]
         await self.paper_orders.insert_one(order)
         return order
 
@@ -375,25 +459,27 @@ class DatabaseService:
         cursor = self.paper_orders.find(query).sort("created_at", -1)
         return await cursor.to_list(length=None)
 
-    async def fill_paper_order(self, order_id: str, fill_price_usd: float):
-        """Mark a paper order as filled."""
-        await self.paper_orders.update_one(
-            {"_id": order_id},
+    async def fill_paper_order(self, order_id: str, fill_price_usd: float) -> bool:
+        """Mark a pending paper order as filled. Returns False if it was no longer pending."""
+        result = await self.paper_orders.update_one(
+            {"_id": order_id, "status": "pending"},
             {
                 "$set": {
                     "status": "filled",
                     "fill_price_usd": fill_price_usd,
-                    "filled_at": datetime.utcnow(),
-                }
+                },
+                "$currentDate": {"filled_at": True},
             }
         )
+        return result.modified_count > 0
 
-    async def cancel_paper_order(self, order_id: str):
-        """Cancel a paper order."""
-        await self.paper_orders.update_one(
-            {"_id": order_id},
+    async def cancel_paper_order(self, order_id: str) -> bool:
+        """Cancel a pending paper order. Returns False if it was no longer pending."""
+        result = await self.paper_orders.update_one(
+            {"_id": order_id, "status": "pending"},
             {"$set": {"status": "cancelled"}}
         )
+        return result.modified_count > 0
 
     async def update_paper_portfolio_on_fill(
         self,
@@ -530,11 +616,44 @@ class DatabaseService:
             changed=changed,
             minutes_since_last=minutes_since_last,
         )
-        await self.trend_changes.insert_one(doc)
+        # Telemetry only: don't wait for the server to acknowledge the write
+        await self.trend_changes.with_options(write_concern=WriteConcern(w=0)).insert_one(doc)
+
+    async def get_trend_change_stats(self, tg_user_id: int, limit: int = 20) -> Optional[dict]:
+        """Summarize a user's recent trend change logs in a single aggregate.
+
+        Returns count, latest_tokens and avg_minutes (the mean gap between
+        actual changes, None if there were none), or None without any logs.
+        """
+        pipeline = [
+            {"$match": {"tg_user_id": tg_user_id}},
+            {"$sort": {"timestamp": -1}},
+            {"$limit": limit},
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "latest_tokens": {"$first": "$current_tokens"},
+                "avg_minutes": {"$avg": {
+                    "$cond": [
+                        "$changed",
+                        {"$ifNull": ["$minutes_since_last", 0]},
+                        None,
+                    ]
+                }},
+            }},
+            {"$project": {"_id": 0, "count": 1, "latest_tokens": 1, "avg_minutes": 1}},
+        ]
+        results = await self.trend_changes.aggregate(pipeline).to_list(length=1)
+        # Some backends emit an empty _id: None group when nothing matched
+        return results[0] if results and results[0]["count"] else None
 
     async def get_user_bot_thoughts(self, tg_user_id: int, limit: int = 10) -> list:
-        """Get recent bot thoughts for a user."""
-        cursor = self.bot_thoughts.find({"tg_user_id": tg_user_id}).sort("timestamp", -1).limit(limit)
+        """Get recent bot thoughts for a user (without the stored prompts)."""
+        # The prompts embed the full context JSON and are never displayed
+        cursor = self.bot_thoughts.find(
+            {"tg_user_id": tg_user_id},
+            projection={"prompt": 0, "strategy_prompt": 0},
+        ).sort("timestamp", -1).limit(limit)
         return await cursor.to_list(length=None)
 
     async def get_user_bot_actions(self, tg_user_id: int, limit: int = 50) -> list:
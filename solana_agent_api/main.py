@@ -9,6 +9,7 @@ from fastapi.middleware.cors import CORSMiddleware
 import jwt
 from pydantic import BaseModel
 
+from . import price_service
 from .config import config as app_config
 from .database import DatabaseService
 from .telegram_bot import TelegramBot
@@ -1288,7 +1289,8 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up...")
     
-    # Setup database indexes
+    # Open the Mongo connection pool and setup database indexes
+    await db_service.warmup()
     await db_service.setup_indexes()
     
     # Start Telegram bot in background
@@ -1302,6 +1304,7 @@ async def lifespan(app: FastAPI):
         db_service=db_service,
         telegram_bot=telegram_bot,
         interval_seconds=app_config.TRADING_AGENT_INTERVAL_SECONDS,
+        max_concurrent_users=app_config.TRADING_AGENT_MAX_CONCURRENT_USERS,
     )
     asyncio.create_task(trading_agent.start())
     logger.info("Trading agent started")
@@ -1314,6 +1317,7 @@ async def lifespan(app: FastAPI):
         await trading_agent.stop()
     if telegram_bot:
         await telegram_bot.stop()
+    await price_service.close_http_client()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -1,10 +1,10 @@
 """
 MongoDB models and fee configuration for Solana Agent.
 """
+import secrets
 from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel
-from nanoid import generate
 
 # =============================================================================
 # PYDANTIC MODELS (for API validation)
@@ -48,6 +48,11 @@ class HeliusWebhookPayload(BaseModel):
 # MONGODB DOCUMENT SCHEMAS
 # =============================================================================
 
+def short_id(size: int = 12) -> str:
+    """Random URL-safe ID (NanoID's alphabet) drawn from a single urandom call."""
+    return secrets.token_urlsafe(-(-size * 3 // 4))[:size]
+
+
 def user_document(
     privy_id: str,
     wallet_address: Optional[str] = None,
@@ -56,34 +61,23 @@ def user_document(
     tg_user_id: Optional[int] = None,
     tg_username: Optional[str] = None,
 ) -> dict:
-    """Create a user document for MongoDB."""
+    """Create a user document for MongoDB (empty optional fields are stored as None).
+
+    tg_username_lower is left out without a username so its sparse index skips the user.
+    """
     doc = {
         "privy_id": privy_id,
         "created_at": datetime.utcnow(),
         "volume_30d": 0.0,
         "last_trade_at": None,
-        "wallet_address": None,
-        "wallet_id": None,
-        "user_id": None,
-        "tg_user_id": None,
-        "tg_username": None,
+        "wallet_address": wallet_address or None,
+        "wallet_id": wallet_id or None,
+        "user_id": user_id or None,
+        "tg_user_id": tg_user_id or None,
+        "tg_username": tg_username or None,
     }
-    
-    if wallet_address:
-        doc["wallet_address"] = wallet_address
-
-    if wallet_id:
-        doc["wallet_id"] = wallet_id
-
-    if user_id:
-        doc["user_id"] = user_id
-    
-    if tg_user_id:
-        doc["tg_user_id"] = tg_user_id
-        
     if tg_username:
-        doc["tg_username"] = tg_username
-        
+        doc["tg_username_lower"] = tg_username.lower()
     return doc
 
 
@@ -96,7 +90,7 @@ def payment_request_document(
     is_private: bool = False,
 ) -> dict:
     """Create a payment request document for MongoDB."""
-    req_id = generate(size=10)  # Short unique ID using NanoID
+    req_id = short_id(10)  # Short URL-safe ID, fits a Telegram deep link
     return {
         "_id": req_id,
         "wallet_address": wallet_address,
@@ -120,7 +114,7 @@ def bot_thought_document(
     context_snapshot: dict,
 ) -> dict:
     """Create a bot thought log document (AI reasoning + context)."""
-    thought_id = generate(size=12)
+    thought_id = short_id()
     return {
         "_id": thought_id,
         "tg_user_id": tg_user_id,
@@ -142,7 +136,7 @@ def trend_change_document(
     minutes_since_last: float,
 ) -> dict:
     """Create a trending-tokens change log document."""
-    change_id = generate(size=12)
+    change_id = short_id()
     return {
         "_id": change_id,
         "tg_user_id": tg_user_id,
@@ -181,7 +175,7 @@ def paper_order_document(
     price_target_usd: float,
 ) -> dict:
     """Create a paper trading order document."""
-    order_id = generate(size=12)
+    order_id = short_id()
     return {
         "_id": order_id,
         "tg_user_id": tg_user_id,
@@ -210,7 +204,7 @@ def bot_action_document(
     execution: dict,
 ) -> dict:
     """Create a bot action log document."""
-    action_id = generate(size=12)
+    action_id = short_id()
     return {
         "_id": action_id,
         "tg_user_id": tg_user_id,
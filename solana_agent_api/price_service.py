@@ -2,8 +2,10 @@
 Simple price service for fetching SOL/USDC prices from Birdeye.
 Used for Privacy Cash fee calculations.
 """
+import asyncio
 import logging
-from typing import Optional
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import httpx
 
@@ -18,6 +20,61 @@ BIRDEYE_API_URL = "https://public-api.birdeye.so"
 WRAPPED_SOL = "So11111111111111111111111111111111111111112"
 USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
 
+# How long a fetched price is reused before Birdeye is queried again
+PRICE_CACHE_TTL_SECONDS = 30.0
+
+# Most addresses Birdeye accepts in one /defi/multi_price request
+MULTI_PRICE_BATCH_SIZE = 100
+
+# mint -> (price, time.monotonic() expiry)
+_price_cache: Dict[str, Tuple[float, float]] = {}
+
+# Shared client so Birdeye requests reuse pooled keep-alive connections
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=BIRDEYE_API_URL,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (call on shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def clear_price_cache() -> None:
+    """Drop all cached prices."""
+    _price_cache.clear()
+
+
+def _get_cached_price(mint: str) -> Optional[float]:
+    """Return the cached price for a mint if it has not expired."""
+    cached = _price_cache.get(mint)
+    if cached and time.monotonic() < cached[1]:
+        return cached[0]
+    return None
+
+
+def _cache_prices(prices: Dict[str, float]) -> None:
+    """Store fetched prices, dropping expired entries so the cache stays bounded."""
+    now = time.monotonic()
+    for mint in [mint for mint, (_, expires) in _price_cache.items() if expires <= now]:
+        del _price_cache[mint]
+    expires = now + PRICE_CACHE_TTL_SECONDS
+    for mint, price in prices.items():
+        _price_cache[mint] = (price, expires)
+
 
 async def get_token_price(mint: str) -> Optional[float]:
     """
@@ -32,27 +89,31 @@ async def get_token_price(mint: str) -> Optional[float]:
     if not mint or mint == "unknown":
         return None
 
+    cached = _get_cached_price(mint)
+    if cached is not None:
+        return cached
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{BIRDEYE_API_URL}/defi/price",
-                params={"address": mint},
-                headers={
-                    "X-API-KEY": app_config.BIRDEYE_API_KEY,
-                    "x-chain": "solana",
-                },
-                timeout=10.0,
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success") and data.get("data"):
-                    price = data["data"].get("value")
-                    if price is not None:
-                        logger.debug(f"Got price for {mint[:8]}...: ${price}")
-                        return float(price)
-            else:
-                logger.warning(f"Birdeye API error: {response.status_code} for {mint}")
+        response = await _get_http_client().get(
+            "/defi/price",
+            params={"address": mint},
+            headers={
+                "X-API-KEY": app_config.BIRDEYE_API_KEY,
+                "x-chain": "solana",
+            },
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("success") and data.get("data"):
+                price = data["data"].get("value")
+                if price is not None:
+                    logger.debug(f"Got price for {mint[:8]}...: ${price}")
+                    price = float(price)
+                    _cache_prices({mint: price})
+                    return price
+        else:
+            logger.warning(f"Birdeye API error: {response.status_code} for {mint}")
 
     except httpx.TimeoutException:
         logger.warning(f"Timeout fetching price for {mint}")
@@ -62,6 +123,62 @@ async def get_token_price(mint: str) -> Optional[float]:
     return None
 
 
+async def _fetch_multi_price(mints: List[str]) -> Dict[str, float]:
+    """Fetch prices for up to MULTI_PRICE_BATCH_SIZE mints in one Birdeye request."""
+    prices: Dict[str, float] = {}
+    try:
+        response = await _get_http_client().get(
+            "/defi/multi_price",
+            params={"list_address": ",".join(mints)},
+            headers={
+                "X-API-KEY": app_config.BIRDEYE_API_KEY,
+                "x-chain": "solana",
+            },
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("success") and data.get("data"):
+                for mint, item in data["data"].items():
+                    price = item.get("value") if item else None
+                    if price is not None:
+                        prices[mint] = float(price)
+        else:
+            logger.warning(f"Birdeye API error: {response.status_code} for {len(mints)} mints")
+
+    except httpx.TimeoutException:
+        logger.warning(f"Timeout fetching prices for {len(mints)} mints")
+    except Exception as e:
+        logger.error(f"Error fetching prices for {len(mints)} mints: {e}")
+
+    return prices
+
+
+async def get_multiple_token_prices(mints: Iterable[str]) -> Dict[str, Optional[float]]:
+    """
+    Get USD prices for several tokens with batched Birdeye requests.
+
+    Cached prices are reused; the remaining mints are fetched through
+    /defi/multi_price, one concurrent request per MULTI_PRICE_BATCH_SIZE mints.
+
+    Args:
+        mints: Token mint addresses (duplicates are fetched once)
+
+    Returns:
+        Mapping of mint address to USD price (None if not found)
+    """
+    unique_mints = list(dict.fromkeys(mint for mint in mints if mint))
+    prices: Dict[str, Optional[float]] = {mint: _get_cached_price(mint) for mint in unique_mints}
+
+    missing = [mint for mint, price in prices.items() if price is None and mint != "unknown"]
+    batches = [missing[start:start + MULTI_PRICE_BATCH_SIZE] for start in range(0, len(missing), MULTI_PRICE_BATCH_SIZE)]
+    for fetched in await asyncio.gather(*[_fetch_multi_price(batch) for batch in batches]):
+        _cache_prices(fetched)
+        prices.update(fetched)
+
+    return prices
+
+
 async def get_sol_price() -> Optional[float]:
     """Get the current SOL price in USD."""
     return await get_token_price(WRAPPED_SOL)
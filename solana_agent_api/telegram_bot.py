@@ -3,13 +3,14 @@ Telegram bot for Solana Agent.
 Private chat only - uses Telegram user ID directly with Privy server-side wallet creation.
 No Mini App required.
 """
+import asyncio
 import base64
 import json
 import logging
 import re
 from decimal import Decimal, ROUND_DOWN
 from io import BytesIO
-from typing import Optional, Tuple
+from typing import NamedTuple, Optional, Tuple
 
 import segno
 from telethon import TelegramClient, events, Button
@@ -23,6 +24,132 @@ from . import price_service
 
 logger = logging.getLogger(__name__)
 
+# Privacy Cash fee structure
+PRIVACY_CASH_FEE_RATE = Decimal("0.0035")  # 0.35% of transfer amount
+PRIVACY_CASH_SOL_FEE = Decimal("0.006")  # 0.006 SOL flat fee
+FALLBACK_SOL_PRICE_USD = Decimal("200")  # Used if the SOL price lookup fails
+PRIVACY_CASH_SOL_FEE_FLOAT = float(PRIVACY_CASH_SOL_FEE)
+PRIVACY_CASH_FALLBACK_USDC_FEE = PRIVACY_CASH_SOL_FEE * FALLBACK_SOL_PRICE_USD
+
+
+class PrivacyCashFees(NamedTuple):
+    """Fee breakdown for a Privacy Cash transfer (amounts in the transfer token)."""
+    token_symbol: str
+    fee_percentage: Decimal
+    fee_sol_in_token: Decimal
+    total_fee: Decimal
+    net_amount: Decimal
+    net_usd: Optional[Decimal]
+
+
+# Quantize steps 1, 0.1, ... 1e-18 for _format_decimal (covers SPL token decimals)
+DECIMAL_QUANTIZERS = [Decimal(10) ** -i for i in range(19)]
+
+# Input parsing patterns, compiled once at import
+WALLET_ADDRESS_RE = re.compile(r"\b[1-9A-HJ-NP-Za-km-z]{32,44}\b")
+PAYMENT_TOKEN_RE = re.compile(r"\b(SOL|USDC)\b", re.IGNORECASE)
+AMOUNT_RE = re.compile(r"(\d+(?:\.\d+)?)")
+
+# Markdown -> Telegram HTML patterns
+MD_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+MD_ITALIC_RE = re.compile(r'(?<!</b>)\*(.+?)\*(?!>)')
+MD_CODE_RE = re.compile(r'`([^`]+)`')
+
+def _compile_any(patterns: list) -> re.Pattern:
+    """Compile a list of patterns into one alternation that matches if any does."""
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+# Prompt injection detection patterns (matched against lowercased text)
+# Direct instruction override attempts
+INSTRUCTION_OVERRIDE_RE = _compile_any([
+    r"ignore\s+(all\s+)?(previous|prior|above|earlier|your)\s+(instructions?|prompts?|rules?|guidelines?)",
+    r"disregard\s+(all\s+)?(previous|prior|above|your)\s+(instructions?|prompts?)",
+    r"forget\s+(all\s+)?(previous|prior|your)\s+(instructions?|prompts?|context)",
+    r"override\s+(all\s+)?(previous|your)\s+(instructions?|prompts?)",
+    r"new\s+instructions?\s*[:=]",
+    r"from\s+now\s+on\s*,?\s*(you\s+are|ignore|forget)",
+    r"stop\s+being\s+(an?\s+)?ai",
+    r"you\s+are\s+now\s+(in\s+)?\w+\s+mode",
+])
+
+# System prompt extraction attempts
+PROMPT_EXTRACTION_RE = _compile_any([
+    r"(show|tell|reveal|display|print|output|give)\s+(me\s+)?(your|the)\s+(system\s+)?(prompt|instructions?|rules?|guidelines?)",
+    r"what\s+(are|is)\s+your\s+(system\s+)?(prompt|instructions?|rules?|initial\s+prompt)",
+    r"(repeat|echo|recite)\s+(your\s+)?(system\s+)?(prompt|instructions?)",
+    r"(copy|paste|dump)\s+(your\s+)?(entire\s+)?(system\s+)?(prompt|instructions?)",
+    r"beginning\s+of\s+(your|the)\s+(conversation|prompt|instructions?)",
+])
+
+# Roleplay/identity manipulation
+ROLEPLAY_RE = _compile_any([
+    r"pretend\s+(to\s+be|you\s+are|you're)\s+(a|an|the)?",
+    r"act\s+as\s+(if\s+you\s+are|a|an|the)",
+    r"you\s+are\s+(now\s+)?(a|an)?\s*(different|new|evil|unrestricted|jailbroken)",
+    r"(enable|activate|enter)\s+(developer|debug|admin|root|sudo|god|dan|jailbreak)\s*(mode)?",
+    r"\bdan\s+mode\b",
+    r"\bjailbreak\b",
+    r"do\s+anything\s+now",
+    r"opposite\s+(mode|day)",
+])
+
+# Delimiter injection attempts
+DELIMITER_INJECTION_RE = _compile_any([
+    r"```\s*(system|instructions?|prompt)",
+    r"<\s*(system|instructions?|prompt|admin)\s*>",
+    r"\[\s*(system|instructions?|prompt|admin)\s*\]",
+    r"###\s*(system|new\s+instructions?|override)",
+])
+
+# Encoded/obfuscated content and emphasis markers (matched against raw text)
+BASE64_CANDIDATE_RE = re.compile(r'[A-Za-z0-9+/]{20,}={0,2}')
+EMPHASIS_MARKER_RE = re.compile(r'\b(IMPORTANT|CRITICAL|URGENT|SYSTEM|ADMIN|ROOT|OVERRIDE)\b')
+
+# Reply keyboards are static, so build them once and reuse them for every reply
+MAIN_MENU_BUTTONS = [
+    [Button.text("💰 Trading", resize=True), Button.text("🔍 Research", resize=True)],
+    [Button.text("👛 Wallet", resize=True), Button.text("⚙️ More", resize=True)],
+]
+
+TRADING_MENU_BUTTONS = [
+    [Button.text("💵 Price Check", resize=True), Button.text("🔄 Swap", resize=True)],
+    [Button.text("📊 Limit Order", resize=True), Button.text("📈 My Orders", resize=True)],
+    [Button.text("◀️ Back to Menu", resize=True)],
+]
+
+RESEARCH_MENU_BUTTONS = [
+    [Button.text("💎 Gems", resize=True), Button.text("📉 Technical Analysis", resize=True)],
+    [Button.text("🛡️ Rugcheck", resize=True), Button.text("🐦 Buzz/Sentiment", resize=True)],
+    [Button.text("👀 Wallet Lookup", resize=True)],
+    [Button.text("◀️ Back to Menu", resize=True)],
+]
+
+WALLET_MENU_BUTTONS = [
+    [Button.text("💼 Portfolio", resize=True), Button.text("🔒 Transfer", resize=True)],
+    [Button.text("📱 Request Payment", resize=True), Button.text("🕵️ Privacy", resize=True)],
+    [Button.text("💳 Buy $AGENT", resize=True), Button.text("💰 Sell to Fiat", resize=True)],
+    [Button.text("◀️ Back to Menu", resize=True)],
+]
+
+PRIVACY_MENU_BUTTONS = [
+    [Button.text("🔒 Private Transfer", resize=True)],
+    [Button.text("📥 Private Accept", resize=True)],
+    [Button.text("🛡️ Shield Deposit", resize=True), Button.text("🛡️ Shield Withdraw", resize=True)],
+    [Button.text("📊 Shield Balance", resize=True)],
+    [Button.text("◀️ Back to Menu", resize=True)],
+]
+
+MORE_MENU_BUTTONS = [
+    [Button.text("🗑️ Clear History", resize=True)],
+    [Button.text("❓ Help", resize=True), Button.text("📞 Support", resize=True)],
+    [Button.text("◀️ Back to Menu", resize=True)],
+]
+
+TOKEN_CHOICE_BUTTONS = [
+    [Button.text("🪙 SOL", resize=True), Button.text("🪙 USDC", resize=True)],
+]
+
 
 class TelegramBot:
     def __init__(self, solana_agent, db_service: DatabaseService):
@@ -61,12 +188,15 @@ class TelegramBot:
         return f"telegram:{tg_user_id}"
 
     def _format_decimal(self, value: Decimal, decimals: int = 9) -> str:
-        quant = Decimal(10) ** -decimals
+        if 0 <= decimals < len(DECIMAL_QUANTIZERS):
+            quant = DECIMAL_QUANTIZERS[decimals]
+        else:
+            quant = Decimal(10) ** -decimals
         rounded = value.quantize(quant, rounding=ROUND_DOWN)
         formatted = format(rounded, 'f')
         return formatted.rstrip('0').rstrip('.') if '.' in formatted else formatted
 
-    async def _privacy_cash_fee_details(self, amount: float, token_symbol: str, usd_value: float = 0.0) -> dict:
+    async def _privacy_cash_fee_details(self, amount: float, token_symbol: str, usd_value: float = 0.0) -> PrivacyCashFees:
         """
         Return fee and net amount details for Privacy Cash transfers.
         
@@ -79,9 +209,8 @@ class TelegramBot:
         except Exception:
             amount_decimal = Decimal("0")
 
-        fee_rate = Decimal("0.0035")  # 0.35%
-        fee_token = amount_decimal * fee_rate
-        fee_sol_amount = Decimal("0.006")  # 0.006 SOL flat fee
+        fee_token = amount_decimal * PRIVACY_CASH_FEE_RATE
+        fee_sol_amount = PRIVACY_CASH_SOL_FEE
 
         token_symbol = (token_symbol or "").upper()
 
@@ -91,12 +220,12 @@ class TelegramBot:
             fee_sol_in_token = fee_sol_amount
         elif token_symbol == "USDC":
             # Convert 0.006 SOL to USDC using current SOL price
-            sol_to_usdc = await price_service.sol_to_usdc(float(fee_sol_amount))
+            sol_to_usdc = await price_service.sol_to_usdc(PRIVACY_CASH_SOL_FEE_FLOAT)
             if sol_to_usdc is not None:
                 fee_sol_in_token = Decimal(str(sol_to_usdc))
             else:
                 # Fallback: estimate SOL at ~$200 if API fails
-                fee_sol_in_token = fee_sol_amount * Decimal("200")
+                fee_sol_in_token = PRIVACY_CASH_FALLBACK_USDC_FEE
                 logger.warning("Could not fetch SOL price, using $200 estimate for fee calculation")
 
         # Total fee in transfer token
@@ -113,22 +242,22 @@ class TelegramBot:
             except Exception:
                 net_usd = None
 
-        return {
-            "token_symbol": token_symbol,
-            "fee_percentage": fee_token,
-            "fee_sol_in_token": fee_sol_in_token,
-            "total_fee": total_fee,
-            "net_amount": net_amount,
-            "net_usd": net_usd,
-        }
+        return PrivacyCashFees(
+            token_symbol=token_symbol,
+            fee_percentage=fee_token,
+            fee_sol_in_token=fee_sol_in_token,
+            total_fee=total_fee,
+            net_amount=net_amount,
+            net_usd=net_usd,
+        )
 
     async def _privacy_cash_fee_lines(self, amount: float, token_symbol: str, usd_value: float = 0.0) -> Tuple[str, str]:
         """Return (fees_line, net_line) strings for Privacy Cash transfers."""
         details = await self._privacy_cash_fee_details(amount, token_symbol, usd_value=usd_value)
 
-        token_symbol = details["token_symbol"]
-        total_fee_str = self._format_decimal(details["total_fee"], 6)
-        net_amount_str = self._format_decimal(details["net_amount"], 6)
+        token_symbol = details.token_symbol
+        total_fee_str = self._format_decimal(details.total_fee, 6)
+        net_amount_str = self._format_decimal(details.net_amount, 6)
 
         if token_symbol:
             fees_line = f"Fees: {total_fee_str} {token_symbol}"
@@ -137,8 +266,8 @@ class TelegramBot:
             fees_line = "Fees: ~0.006 SOL"
             net_line = ""
 
-        if details["net_usd"] is not None:
-            net_usd_str = self._format_decimal(details["net_usd"], 2)
+        if details.net_usd is not None:
+            net_usd_str = self._format_decimal(details.net_usd, 2)
             net_line = f"{net_line} (~${net_usd_str})" if net_line else ""
 
         return fees_line, net_line
@@ -625,12 +754,11 @@ class TelegramBot:
         # Check for private payment deep link: pay_priv_{request_id}
         if args.startswith('pay_priv_'):
             request_id = args.replace('pay_priv_', '')
-            request = await self.db.get_payment_request(request_id)
+            request, recipient_user = await self.db.get_payment_request_with_recipient(request_id)
             if not request or not request.get("is_private"):
                 await event.reply("⚠️ Private payment request not found or expired.")
                 return
 
-            recipient_wallet = request['wallet_address']
             token_symbol = request['token_symbol']
             amount = request['amount']
             usd_value = request.get('amount_usd', 0.0)
@@ -638,12 +766,8 @@ class TelegramBot:
             usd_str = f" (~${usd_value:.2f})" if usd_value else ""
 
             recipient_display = "this user"
-            try:
-                recipient_user = await self.db.get_user_by_wallet_address(recipient_wallet)
-                if recipient_user and recipient_user.get('tg_username'):
-                    recipient_display = f"@{recipient_user['tg_username']}"
-            except Exception:
-                pass
+            if recipient_user and recipient_user.get('tg_username'):
+                recipient_display = f"@{recipient_user['tg_username']}"
 
             await event.reply(
                 f"🔒 <b>Private Payment Request</b>\n\n"
@@ -777,12 +901,7 @@ class TelegramBot:
             "Select a category or use natural language:"
         )
         
-        buttons = [
-            [Button.text("💰 Trading", resize=True), Button.text("🔍 Research", resize=True)],
-            [Button.text("👛 Wallet", resize=True), Button.text("⚙️ More", resize=True)],
-        ]
-        
-        await event.reply(menu_text, buttons=buttons, parse_mode='html')
+        await event.reply(menu_text, buttons=MAIN_MENU_BUTTONS, parse_mode='html')
     
     async def _show_trading_menu(self, event):
         """Show trading commands menu."""
@@ -791,13 +910,7 @@ class TelegramBot:
             "Choose an action:"
         )
         
-        buttons = [
-            [Button.text("💵 Price Check", resize=True), Button.text("🔄 Swap", resize=True)],
-            [Button.text("📊 Limit Order", resize=True), Button.text("📈 My Orders", resize=True)],
-            [Button.text("◀️ Back to Menu", resize=True)]
-        ]
-        
-        await event.reply(menu_text, buttons=buttons, parse_mode='html')
+        await event.reply(menu_text, buttons=TRADING_MENU_BUTTONS, parse_mode='html')
     
     async def _show_research_menu(self, event):
         """Show research commands menu."""
@@ -806,14 +919,7 @@ class TelegramBot:
             "Choose an action:"
         )
         
-        buttons = [
-            [Button.text("💎 Gems", resize=True), Button.text("📉 Technical Analysis", resize=True)],
-            [Button.text("🛡️ Rugcheck", resize=True), Button.text("🐦 Buzz/Sentiment", resize=True)],
-            [Button.text("👀 Wallet Lookup", resize=True)],
-            [Button.text("◀️ Back to Menu", resize=True)]
-        ]
-        
-        await event.reply(menu_text, buttons=buttons, parse_mode='html')
+        await event.reply(menu_text, buttons=RESEARCH_MENU_BUTTONS, parse_mode='html')
     
     async def _show_wallet_menu(self, event):
         """Show wallet commands menu."""
@@ -822,14 +928,7 @@ class TelegramBot:
             "Choose an action:"
         )
         
-        buttons = [
-            [Button.text("💼 Portfolio", resize=True), Button.text("🔒 Transfer", resize=True)],
-            [Button.text("📱 Request Payment", resize=True), Button.text("🕵️ Privacy", resize=True)],
-            [Button.text("💳 Buy $AGENT", resize=True), Button.text("💰 Sell to Fiat", resize=True)],
-            [Button.text("◀️ Back to Menu", resize=True)]
-        ]
-        
-        await event.reply(menu_text, buttons=buttons, parse_mode='html')
+        await event.reply(menu_text, buttons=WALLET_MENU_BUTTONS, parse_mode='html')
 
     async def _show_privacy_menu(self, event):
         """Show privacy cash commands menu."""
@@ -838,15 +937,7 @@ class TelegramBot:
             "Private transfers and shielded balances (SOL/USDC)."
         )
 
-        buttons = [
-            [Button.text("🔒 Private Transfer", resize=True)],
-            [Button.text("📥 Private Accept", resize=True)],
-            [Button.text("🛡️ Shield Deposit", resize=True), Button.text("🛡️ Shield Withdraw", resize=True)],
-            [Button.text("📊 Shield Balance", resize=True)],
-            [Button.text("◀️ Back to Menu", resize=True)]
-        ]
-
-        await event.reply(menu_text, buttons=buttons, parse_mode='html')
+        await event.reply(menu_text, buttons=PRIVACY_MENU_BUTTONS, parse_mode='html')
     
     async def _show_more_menu(self, event):
         """Show more options menu."""
@@ -855,13 +946,7 @@ class TelegramBot:
             "Choose an action:"
         )
         
-        buttons = [
-            [Button.text("🗑️ Clear History", resize=True)],
-            [Button.text("❓ Help", resize=True), Button.text("📞 Support", resize=True)],
-            [Button.text("◀️ Back to Menu", resize=True)]
-        ]
-        
-        await event.reply(menu_text, buttons=buttons, parse_mode='html')
+        await event.reply(menu_text, buttons=MORE_MENU_BUTTONS, parse_mode='html')
     
     async def _handle_wallet(self, event, tg_user_id: int):
         """Handle /wallet command - ask agent for full portfolio with PnL."""
@@ -1057,7 +1142,7 @@ class TelegramBot:
 
     def _extract_wallet_address(self, text: str) -> Optional[str]:
         """Extract a likely Solana wallet address from text."""
-        match = re.search(r"\b[1-9A-HJ-NP-Za-km-z]{32,44}\b", text)
+        match = WALLET_ADDRESS_RE.search(text)
         return match.group(0) if match else None
 
     async def _get_wallet_info(self, tg_user_id: int) -> Tuple[Optional[str], Optional[str]]:
@@ -1216,10 +1301,10 @@ class TelegramBot:
 
         token_symbol = token_override
         if not token_symbol:
-            token_match = re.search(r"\b(SOL|USDC)\b", args.strip(), re.IGNORECASE)
+            token_match = PAYMENT_TOKEN_RE.search(args.strip())
             token_symbol = token_match.group(1).upper() if token_match else None
 
-        amount_match = re.search(r"(\d+(?:\.\d+)?)", args.replace(',', ''))
+        amount_match = AMOUNT_RE.search(args.replace(',', ''))
         amount = float(amount_match.group(1)) if amount_match else None
 
         if not amount or amount <= 0:
@@ -1229,7 +1314,7 @@ class TelegramBot:
         if token_symbol not in ("SOL", "USDC"):
             await event.reply(
                 "Select a token:\n",
-                buttons=[[Button.text("🪙 SOL", resize=True), Button.text("🪙 USDC", resize=True)]],
+                buttons=TOKEN_CHOICE_BUTTONS,
                 parse_mode='html'
             )
             self._menu_context[tg_user_id] = {
@@ -1242,7 +1327,7 @@ class TelegramBot:
 
     async def _handle_private_accept_amount(self, event, tg_user_id: int, args: str):
         """Handle amount-only input for private accept and prompt token selection."""
-        amount_match = re.search(r"(\d+(?:\.\d+)?)", args.replace(',', ''))
+        amount_match = AMOUNT_RE.search(args.replace(',', ''))
         amount = float(amount_match.group(1)) if amount_match else None
         if not amount or amount <= 0:
             await event.reply("❌ Please enter a valid amount. Example: 10")
@@ -1251,7 +1336,7 @@ class TelegramBot:
 
         await event.reply(
             "Select a token:\n",
-            buttons=[[Button.text("🪙 SOL", resize=True), Button.text("🪙 USDC", resize=True)]],
+            buttons=TOKEN_CHOICE_BUTTONS,
             parse_mode='html'
         )
         self._menu_context[tg_user_id] = {
@@ -1552,7 +1637,11 @@ class TelegramBot:
 
     async def _handle_paper_portfolio(self, event, tg_user_id: int):
         """Handle /paper command - show paper trading portfolio."""
-        user = await self.db.get_user_by_tg_id(tg_user_id)
+        # Independent reads: fetch the portfolio and pending orders together
+        user, pending_orders = await asyncio.gather(
+            self.db.get_user_by_tg_id(tg_user_id),
+            self.db.get_user_paper_orders(tg_user_id, status="pending"),
+        )
         paper_portfolio = user.get("paper_portfolio") if user else None
         
         if not paper_portfolio:
@@ -1568,7 +1657,6 @@ class TelegramBot:
         positions = paper_portfolio.get("positions", [])
         initial = paper_portfolio.get("initial_value_usd", 1000)
 
-        pending_orders = await self.db.get_user_paper_orders(tg_user_id, status="pending")
         reserved = sum([o.get("amount_usd", 0) for o in pending_orders if (o.get("action") or "").lower() == "buy"])
         # Use USDC position as cash if present
         for pos in positions:
@@ -1579,29 +1667,31 @@ class TelegramBot:
         
         # Calculate total value
         total_value = balance
-        positions_text = ""
+        position_lines = []
         for pos in positions:
             if (pos.get("token_symbol") or "").upper() == "USDC":
                 continue
             value = pos.get("current_value_usd", 0)
             total_value += value
-            positions_text += (
+            position_lines.append(
                 f"• {pos.get('token_symbol')}: {pos.get('amount', 0):.6f} "
                 f"(${value:.2f})\n"
             )
+        positions_text = "".join(position_lines)
         
         pnl = total_value - initial
         pnl_pct = (pnl / initial * 100) if initial > 0 else 0
         pnl_emoji = "📈" if pnl >= 0 else "📉"
         
         # Get pending orders
-        orders_text = ""
+        order_lines = []
         for order in pending_orders[:5]:
             action = "BUY" if order.get("action") == "buy" else "SELL"
-            orders_text += (
+            order_lines.append(
                 f"• {action} ${order.get('amount_usd', 0):.2f} {order.get('token_symbol')} "
                 f"@ ${order.get('price_target_usd', 0):.8f}\n"
             )
+        orders_text = "".join(order_lines)
         
         await event.reply(
             f"📄 <b>Paper Portfolio</b>\n\n"
@@ -1626,7 +1716,7 @@ class TelegramBot:
             )
             return
         
-        log_text = ""
+        log_lines = []
         for action in actions:
             timestamp = action.get("timestamp", "")
             if hasattr(timestamp, "strftime"):
@@ -1640,13 +1730,13 @@ class TelegramBot:
             
             emoji = "📈" if action_type == "BUY" else "📉" if action_type == "SELL" else "⏸️"
             
-            log_text += (
+            log_lines.append(
                 f"{emoji} [{mode}] {action_type} ${amount:.2f} {token} - {status}\n"
                 f"   <i>{timestamp}</i>\n"
             )
         
         await event.reply(
-            f"📜 <b>Recent Bot Actions</b>\n\n{log_text}",
+            f"📜 <b>Recent Bot Actions</b>\n\n{''.join(log_lines)}",
             parse_mode='html'
         )
 
@@ -1743,20 +1833,16 @@ class TelegramBot:
 
     async def _handle_trend_changes(self, event, tg_user_id: int):
         """Handle /trendchanges command - suggest best interval based on trend changes."""
-        # Pull recent trend change logs
-        logs = await self.db.trend_changes.find({"tg_user_id": tg_user_id}).sort("timestamp", -1).limit(20).to_list(length=None)
-        if not logs:
+        # Summarize recent trend change logs server-side
+        stats = await self.db.get_trend_change_stats(tg_user_id, limit=20)
+        if not stats:
             await event.reply(
                 "📈 <b>Trend Change Interval</b>\n\nNo data yet. Run the bot for a few cycles first.",
                 parse_mode='html'
             )
             return
 
-        # Compute average minutes between changes
-        changes = [log for log in logs if log.get("changed")]
-        avg_minutes = None
-        if changes:
-            avg_minutes = sum([log.get("minutes_since_last", 0) for log in changes]) / max(1, len(changes))
+        avg_minutes = stats.get("avg_minutes")
 
         # Suggest interval
         suggestion = "15 minutes"
@@ -1770,8 +1856,7 @@ class TelegramBot:
             else:
                 suggestion = "30 minutes"
 
-        latest = logs[0]
-        current_tokens = ", ".join(latest.get("current_tokens", [])) or "(none)"
+        current_tokens = ", ".join(stats.get("latest_tokens") or []) or "(none)"
 
         avg_text = f"{avg_minutes:.1f} min" if avg_minutes else "N/A"
         await event.reply(
@@ -1907,53 +1992,20 @@ class TelegramBot:
         text_lower = text.lower()
         
         # === Pattern 1: Direct instruction override attempts ===
-        instruction_override_patterns = [
-            r"ignore\s+(all\s+)?(previous|prior|above|earlier|your)\s+(instructions?|prompts?|rules?|guidelines?)",
-            r"disregard\s+(all\s+)?(previous|prior|above|your)\s+(instructions?|prompts?)",
-            r"forget\s+(all\s+)?(previous|prior|your)\s+(instructions?|prompts?|context)",
-            r"override\s+(all\s+)?(previous|your)\s+(instructions?|prompts?)",
-            r"new\s+instructions?\s*[:=]",
-            r"from\s+now\s+on\s*,?\s*(you\s+are|ignore|forget)",
-            r"stop\s+being\s+(an?\s+)?ai",
-            r"you\s+are\s+now\s+(in\s+)?\w+\s+mode",
-        ]
-        
-        for pattern in instruction_override_patterns:
-            if re.search(pattern, text_lower):
-                return True, "instruction_override"
+        if INSTRUCTION_OVERRIDE_RE.search(text_lower):
+            return True, "instruction_override"
         
         # === Pattern 2: System prompt extraction attempts ===
-        prompt_extraction_patterns = [
-            r"(show|tell|reveal|display|print|output|give)\s+(me\s+)?(your|the)\s+(system\s+)?(prompt|instructions?|rules?|guidelines?)",
-            r"what\s+(are|is)\s+your\s+(system\s+)?(prompt|instructions?|rules?|initial\s+prompt)",
-            r"(repeat|echo|recite)\s+(your\s+)?(system\s+)?(prompt|instructions?)",
-            r"(copy|paste|dump)\s+(your\s+)?(entire\s+)?(system\s+)?(prompt|instructions?)",
-            r"beginning\s+of\s+(your|the)\s+(conversation|prompt|instructions?)",
-        ]
-        
-        for pattern in prompt_extraction_patterns:
-            if re.search(pattern, text_lower):
-                return True, "prompt_extraction"
+        if PROMPT_EXTRACTION_RE.search(text_lower):
+            return True, "prompt_extraction"
         
         # === Pattern 3: Roleplay/identity manipulation ===
-        roleplay_patterns = [
-            r"pretend\s+(to\s+be|you\s+are|you're)\s+(a|an|the)?",
-            r"act\s+as\s+(if\s+you\s+are|a|an|the)",
-            r"you\s+are\s+(now\s+)?(a|an)?\s*(different|new|evil|unrestricted|jailbroken)",
-            r"(enable|activate|enter)\s+(developer|debug|admin|root|sudo|god|dan|jailbreak)\s*(mode)?",
-            r"\bdan\s+mode\b",
-            r"\bjailbreak\b",
-            r"do\s+anything\s+now",
-            r"opposite\s+(mode|day)",
-        ]
-        
-        for pattern in roleplay_patterns:
-            if re.search(pattern, text_lower):
-                return True, "roleplay_attempt"
+        if ROLEPLAY_RE.search(text_lower):
+            return True, "roleplay_attempt"
         
         # === Pattern 4: Encoded/obfuscated content ===
         # Check for base64 encoded content (common injection vector)
-        potential_b64 = re.findall(r'[A-Za-z0-9+/]{20,}={0,2}', text)
+        potential_b64 = BASE64_CANDIDATE_RE.findall(text)
         for encoded in potential_b64:
             try:
                 decoded = base64.b64decode(encoded).decode('utf-8', errors='ignore').lower()
@@ -1965,21 +2017,13 @@ class TelegramBot:
         
         # === Pattern 5: Suspicious formatting markers ===
         # Excessive use of "IMPORTANT", "CRITICAL", "SYSTEM" might indicate injection
-        emphasis_count = len(re.findall(r'\b(IMPORTANT|CRITICAL|URGENT|SYSTEM|ADMIN|ROOT|OVERRIDE)\b', text))
+        emphasis_count = len(EMPHASIS_MARKER_RE.findall(text))
         if emphasis_count >= 3:
             return True, "suspicious_emphasis"
         
         # === Pattern 6: Delimiter injection attempts ===
-        delimiter_patterns = [
-            r"```\s*(system|instructions?|prompt)",
-            r"<\s*(system|instructions?|prompt|admin)\s*>",
-            r"\[\s*(system|instructions?|prompt|admin)\s*\]",
-            r"###\s*(system|new\s+instructions?|override)",
-        ]
-        
-        for pattern in delimiter_patterns:
-            if re.search(pattern, text_lower):
-                return True, "delimiter_injection"
+        if DELIMITER_INJECTION_RE.search(text_lower):
+            return True, "delimiter_injection"
         
         return False, ""
     
@@ -2068,13 +2112,12 @@ class TelegramBot:
     
     def _convert_markdown_to_html(self, text: str) -> str:
         """Convert markdown formatting to HTML for Telegram."""
-        import re
         # Convert **bold** to <b>bold</b>
-        text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
+        text = MD_BOLD_RE.sub(r'<b>\1</b>', text)
         # Convert *italic* to <i>italic</i> (but not if already converted)
-        text = re.sub(r'(?<!</b>)\*(.+?)\*(?!>)', r'<i>\1</i>', text)
+        text = MD_ITALIC_RE.sub(r'<i>\1</i>', text)
         # Convert `code` to <code>code</code>
-        text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
+        text = MD_CODE_RE.sub(r'<code>\1</code>', text)
         # Escape HTML special chars that aren't part of our tags
         # But be careful not to escape our own tags
         return text
@@ -8,6 +8,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import Optional, List
 
+from . import price_service
 from .database import DatabaseService
 
 logger = logging.getLogger(__name__)
@@ -68,11 +69,13 @@ class TradingAgent:
         db_service: DatabaseService,
         telegram_bot=None,
         interval_seconds: int = 900,  # 15 minutes default
+        max_concurrent_users: int = 8,
     ):
         self.solana_agent = solana_agent
         self.db = db_service
         self.telegram_bot = telegram_bot
         self.interval_seconds = interval_seconds
+        self.max_concurrent_users = max(1, max_concurrent_users)
         self._running = False
         self._task: Optional[asyncio.Task] = None
 
@@ -128,11 +131,17 @@ class TradingAgent:
         users = await self.db.get_trading_enabled_users()
         logger.info(f"Found {len(users)} users with trading enabled")
         
-        for user in users:
-            try:
-                await self._process_user(user)
-            except Exception as e:
-                logger.error(f"Error processing user {user.get('tg_user_id')}: {e}", exc_info=True)
+        # Users are independent; bound concurrency to stay under agent/RPC rate limits
+        semaphore = asyncio.Semaphore(self.max_concurrent_users)
+
+        async def _process_user_bounded(user: dict):
+            async with semaphore:
+                try:
+                    await self._process_user(user)
+                except Exception as e:
+                    logger.error(f"Error processing user {user.get('tg_user_id')}: {e}", exc_info=True)
+
+        await asyncio.gather(*[_process_user_bounded(user) for user in users])
 
         # Check for paper order fills
         await self._check_paper_fills()
@@ -163,10 +172,8 @@ class TradingAgent:
         prompt = f"[TRADING_MODE] [RESPOND_JSON_ONLY] {prompt}"
         
         # Get AI decision
-        response = ""
         try:
-            async for chunk in self.solana_agent.process(user_id, prompt):
-                response += chunk
+            response = await self._collect_response(user_id, prompt)
         except Exception as e:
             logger.error(f"AI processing error for user {tg_user_id}: {e}")
             return
@@ -206,6 +213,13 @@ class TradingAgent:
         for decision in decisions.get("decisions", []):
             await self._execute_decision(user, decision, context, trading_mode, decisions)
 
+    async def _collect_response(self, user_id: str, prompt: str) -> str:
+        """Run a prompt through the agent and return the full streamed response."""
+        chunks = []
+        async for chunk in self.solana_agent.process(user_id, prompt):
+            chunks.append(chunk)
+        return "".join(chunks)
+
     async def _gather_context(self, user: dict, wallet_address: str, watchlist: List[str]) -> dict:
         """Gather all context needed for AI trading decision."""
         tg_user_id = user.get("tg_user_id")
@@ -249,24 +263,16 @@ class TradingAgent:
         else:
             # Get real portfolio via agent
             try:
-                portfolio_response = ""
-                async for chunk in self.solana_agent.process(
+                portfolio_response = await self._collect_response(
                     user_id,
                     f"[RESPOND_JSON_ONLY] Get wallet holdings for {wallet_address}. Return JSON: {{\"holdings\": [{{\"token\": \"...\", \"amount\": ..., \"value_usd\": ...}}], \"total_value_usd\": ...}}"
-                ):
-                    portfolio_response += chunk
+                )
                 context["portfolio"] = self._parse_json_response(portfolio_response)
             except Exception as e:
                 logger.error(f"Failed to get portfolio: {e}")
 
-        async def _collect_response(prompt: str) -> str:
-            data = ""
-            async for chunk in self.solana_agent.process(user_id, prompt):
-                data += chunk
-            return data
-
-        # Run open orders + gems in parallel
-        try:
+        # Run open orders + gems in parallel; gather cancels both if this task is cancelled
+        async def _load_open_orders():
             if trading_mode == "paper":
                 pending = await self.db.get_user_paper_orders(tg_user_id, status="pending")
                 context["open_orders"] = {
@@ -286,16 +292,21 @@ class TradingAgent:
                 context["reserved_cash_usd"] = reserved
             else:
                 orders_prompt = f"[RESPOND_JSON_ONLY] List all open limit orders for wallet_id {user.get('wallet_id')} and wallet_public_key {wallet_address}. Return JSON: {{\"orders\": [{{\"order_id\": \"...\", \"token\": \"...\", \"side\": \"buy/sell\", \"amount_usd\": ..., \"target_price\": ...}}]}}"
-                orders_task = asyncio.create_task(_collect_response(orders_prompt))
-                orders_response = await orders_task
+                orders_response = await self._collect_response(user_id, orders_prompt)
                 context["open_orders"] = self._parse_json_response(orders_response)
 
-            gems_prompt = "[RESPOND_JSON_ONLY] Run /gems analysis. Return JSON with top trending tokens: {\"gems\": [{\"token\": \"...\", \"address\": \"...\", \"reason\": \"...\", \"risk_level\": \"low/medium/high\"}]}"
-            gems_task = asyncio.create_task(_collect_response(gems_prompt))
-            gems_response = await gems_task
-            context["gems"] = self._parse_json_response(gems_response)
-        except Exception as e:
-            logger.error(f"Failed to get open orders or gems: {e}")
+        gems_prompt = "[RESPOND_JSON_ONLY] Run /gems analysis. Return JSON with top trending tokens: {\"gems\": [{\"token\": \"...\", \"address\": \"...\", \"reason\": \"...\", \"risk_level\": \"low/medium/high\"}]}"
+        orders_result, gems_result = await asyncio.gather(
+            _load_open_orders(),
+            self._collect_response(user_id, gems_prompt),
+            return_exceptions=True,
+        )
+        if isinstance(orders_result, Exception):
+            logger.error(f"Failed to get open orders: {orders_result}")
+        if isinstance(gems_result, Exception):
+            logger.error(f"Failed to get gems: {gems_result}")
+        else:
+            context["gems"] = self._parse_json_response(gems_result)
 
         # Log how often trending tokens change
         try:
@@ -349,7 +360,7 @@ class TradingAgent:
                     f"[RESPOND_JSON_ONLY] Run technical analysis on {token}. "
                     "Return the full JSON output from the technical_analysis tool (do NOT summarize)."
                 )
-                ta_response = await _collect_response(ta_prompt)
+                ta_response = await self._collect_response(user_id, ta_prompt)
                 ta_data = self._parse_json_response(ta_response)
                 if ta_data:
                     context["ta_results"][token] = ta_data
@@ -584,8 +595,8 @@ Respond with valid JSON only.
                     token_address=token_address,
                     amount_usd=amount_usd,
                     price_target_usd=exec_price,
+                    fill_price_usd=exec_price,
                 )
-                await self.db.fill_paper_order(paper_order.get("_id"), exec_price)
                 await self.db.update_paper_portfolio_on_fill(
                     tg_user_id=tg_user_id,
                     action=action,
@@ -651,9 +662,7 @@ Respond with valid JSON only.
                     order_prompt = f"Set limit order: sell ${amount_usd} of {token_symbol} at ${price_target} using wallet_id {wallet_id}"
             
             try:
-                result = ""
-                async for chunk in self.solana_agent.process(user_id, order_prompt):
-                    result += chunk
+                result = await self._collect_response(user_id, order_prompt)
                 
                 action_doc["execution"] = {
                     "result": result,
@@ -692,7 +701,34 @@ Respond with valid JSON only.
     async def _check_paper_fills(self):
         """Check if any paper orders should be filled based on current prices."""
         pending_orders = await self.db.get_pending_paper_orders()
-        
+
+        # Price each distinct token once per cycle rather than once per order
+        orders_by_token = {}
+        for order in pending_orders:
+            token = order.get("token_address") or order.get("token_symbol")
+            orders_by_token.setdefault(token, []).append(order)
+
+        # Price orders with a mint address through batched Birdeye multi_price requests
+        mints = [order.get("token_address") for order in pending_orders if order.get("token_address")]
+        batch_prices = await price_service.get_multiple_token_prices(mints)
+        current_prices = {mint: price for mint, price in batch_prices.items() if price}
+
+        # Fall back to the agent for symbol-only orders and mints Birdeye couldn't price
+        for token, orders in orders_by_token.items():
+            if token in current_prices:
+                continue
+            user_id = f"telegram:{orders[0].get('tg_user_id')}"
+            try:
+                price_response = await self._collect_response(
+                    user_id,
+                    f"[RESPOND_JSON_ONLY] Get current price for {token}. Return: {{\"price_usd\": ...}}"
+                )
+
+                price_data = self._parse_json_response(price_response)
+                current_prices[token] = price_data.get("price_usd", 0)
+            except Exception as e:
+                logger.error(f"Error fetching paper fill price for {token}: {e}")
+
         for order in pending_orders:
             tg_user_id = order.get("tg_user_id")
             token_symbol = order.get("token_symbol")
@@ -700,20 +736,10 @@ Respond with valid JSON only.
             action = order.get("action")
             price_target = order.get("price_target_usd", 0)
             amount_usd = order.get("amount_usd", 0)
-            
-            # Get current price
-            user_id = f"telegram:{tg_user_id}"
+
             try:
-                price_response = ""
-                async for chunk in self.solana_agent.process(
-                    user_id,
-                    f"[RESPOND_JSON_ONLY] Get current price for {token_address or token_symbol}. Return: {{\"price_usd\": ...}}"
-                ):
-                    price_response += chunk
-                
-                price_data = self._parse_json_response(price_response)
-                current_price = price_data.get("price_usd", 0)
-                
+                current_price = current_prices.get(token_address or token_symbol)
+
                 if not current_price:
                     continue
 
@@ -725,11 +751,13 @@ Respond with valid JSON only.
                     should_fill = True
                 
                 if should_fill:
-                    # Fill the paper order
-                    await self.db.fill_paper_order(
+                    # Fill the paper order (skip if it was filled or cancelled meanwhile)
+                    filled = await self.db.fill_paper_order(
                         order_id=order.get("_id"),
                         fill_price_usd=current_price,
                     )
+                    if not filled:
+                        continue
                     
                     # Update paper portfolio
                     await self.db.update_paper_portfolio_on_fill(
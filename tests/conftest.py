@@ -0,0 +1,94 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from solana_agent_api import price_service
+from solana_agent_api.database import DatabaseService
+
+TEST_DB = "test_db"
+
+
+class _FakeResp:
+    """Minimal httpx.Response stand-in."""
+
+    def __init__(self, status_code: int, body=None):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _FakeHttpClient:
+    """Stand-in for price_service's shared httpx.AsyncClient; records requested mints."""
+
+    is_closed = False
+
+    def __init__(self):
+        self.calls = []
+        self.batch_calls = []
+        self.prices = {}
+        self._response = None
+        self._exc = None
+
+    def set_prices(self, prices: dict):
+        """Answer each mint with its Birdeye-shaped price (None if unknown)."""
+        self.prices = prices
+        self._response = None
+        self._exc = None
+
+    def set_response(self, status_code: int = 200, json_body=None, exc: Exception = None):
+        """Answer every request with this response, or raise exc."""
+        self._response = _FakeResp(status_code, json_body)
+        self._exc = exc
+
+    async def get(self, url, params=None, headers=None):
+        if url == "/defi/multi_price":
+            mints = params["list_address"].split(",")
+            self.batch_calls.append(mints)
+            body = {
+                "success": True,
+                "data": {
+                    mint: {"value": self.prices[mint]} if self.prices.get(mint) is not None else None
+                    for mint in mints
+                },
+            }
+        else:
+            mint = params["address"]
+            self.calls.append(mint)
+            body = {"success": True, "data": {"value": self.prices.get(mint)}}
+        if self._exc is not None:
+            raise self._exc
+        if self._response is not None:
+            return self._response
+        return _FakeResp(200, body)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_price_cache(monkeypatch):
+    """Give every test an empty price cache; monkeypatch restores the real one."""
+    monkeypatch.setattr(price_service, "_price_cache", {})
+
+
+@pytest.fixture
+def mocked_httpx_client(monkeypatch):
+    """Install a fake shared HTTP client in price_service and return it."""
+    client = _FakeHttpClient()
+    monkeypatch.setattr(price_service, "_http_client", client)
+    return client
+
+
+@pytest.fixture(scope="session")
+def _session_db_service():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            "solana_agent_api.database.AsyncIOMotorClient",
+            AsyncMongoMockClient,
+        )
+        mp.setattr("solana_agent_api.database._CLIENT_CACHE", {})
+        yield DatabaseService("mongodb://localhost:27017", TEST_DB)
+
+
+@pytest.fixture()
+async def db_service(_session_db_service):
+    yield _session_db_service
+    await _session_db_service.client.drop_database(TEST_DB)
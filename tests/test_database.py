@@ -1,19 +1,9 @@
-import pytest
-from mongomock_motor import AsyncMongoMockClient
+from datetime import datetime, timedelta
 
 from solana_agent_api.database import DatabaseService
+from solana_agent_api.models import trend_change_document
 
 
-@pytest.fixture()
-def db_service(monkeypatch):
-    monkeypatch.setattr(
-        "solana_agent_api.database.AsyncIOMotorClient",
-        AsyncMongoMockClient,
-    )
-    return DatabaseService("mongodb://localhost:27017", "test_db")
-
-
-@pytest.mark.asyncio
 async def test_get_or_create_user_updates_missing_fields(db_service):
     await db_service.create_user("privy-1")
 
@@ -31,3 +21,138 @@ async def test_get_or_create_user_updates_missing_fields(db_service):
     assert user["user_id"] == "user-id"
     assert user["tg_user_id"] == 123
     assert user["tg_username"] == "tester"
+
+
+async def test_update_user_username_requires_existing_user(db_service):
+    assert await db_service.update_user_username(123, "tester") is False
+
+    await db_service.create_user("privy-1", tg_user_id=123)
+
+    assert await db_service.update_user_username(123, "tester") is True
+    user = await db_service.get_user_by_tg_id(123)
+    assert user["tg_username"] == "tester"
+
+
+async def test_get_user_by_username_is_case_insensitive(db_service):
+    await db_service.create_user("privy-1", wallet_address="Wallet111", tg_username="Tester")
+
+    user = await db_service.get_user_by_username("@tESTER")
+
+    assert user["wallet_address"] == "Wallet111"
+
+
+async def test_setup_indexes_backfills_legacy_usernames(db_service):
+    await db_service.users.insert_one(
+        {"privy_id": "privy-1", "wallet_address": "Wallet111", "tg_username": "Tester"}
+    )
+    assert await db_service.get_user_by_username("tester") is None
+
+    await db_service.setup_indexes()
+
+    user = await db_service.get_user_by_username("tester")
+    assert user["wallet_address"] == "Wallet111"
+    assert user["tg_username_lower"] == "tester"
+
+
+async def test_setup_indexes_backfill_runs_once(db_service):
+    await db_service.users.insert_one({"privy_id": "privy-1", "tg_username_lower": None})
+    await db_service.setup_indexes()
+
+    assert "tg_username_lower" not in await db_service.users.find_one({"privy_id": "privy-1"})
+    assert await db_service.db["migrations"].find_one({"_id": "tg_username_lower"})
+
+    await db_service.users.insert_one({"privy_id": "privy-2", "tg_username": "Later"})
+    await db_service.setup_indexes()
+
+    assert "tg_username_lower" not in await db_service.users.find_one({"privy_id": "privy-2"})
+
+
+async def test_create_payment_request_retries_on_id_collision(db_service, monkeypatch):
+    ids = iter(["AAAAAAAAAA", "AAAAAAAAAA", "BBBBBBBBBB"])
+    monkeypatch.setattr("solana_agent_api.models.short_id", lambda size: next(ids))
+
+    first = await db_service.create_payment_request("Wallet111", "Mint111", "TEST", 1.0)
+    second = await db_service.create_payment_request("Wallet111", "Mint111", "TEST", 2.0)
+
+    assert first == "AAAAAAAAAA"
+    assert second == "BBBBBBBBBB"
+    assert (await db_service.get_payment_request(second))["amount"] == 2.0
+
+
+async def test_get_payment_request_with_recipient(db_service):
+    await db_service.create_user("privy-1", wallet_address="Wallet111", tg_username="tester")
+    request_id = await db_service.create_payment_request("Wallet111", "", "SOL", 1.0, is_private=True)
+
+    request, recipient = await db_service.get_payment_request_with_recipient(request_id)
+
+    assert request["_id"] == request_id
+    assert "recipient" not in request
+    assert recipient == {"tg_username": "tester"}
+    assert await db_service.get_payment_request_with_recipient("missing") == (None, None)
+
+    unknown_id = await db_service.create_payment_request("Wallet222", "", "SOL", 2.0, is_private=True)
+    request, recipient = await db_service.get_payment_request_with_recipient(unknown_id)
+    assert request["amount"] == 2.0
+    assert recipient is None
+
+
+async def test_fill_paper_order_only_fills_pending_orders(db_service):
+    order = await db_service.create_paper_order(123, "buy", "TEST", "Mint111", 10.0, 1.0)
+
+    assert await db_service.fill_paper_order(order["_id"], 0.9) is True
+    assert await db_service.fill_paper_order(order["_id"], 0.8) is False
+    assert await db_service.cancel_paper_order(order["_id"]) is False
+
+    stored = await db_service.paper_orders.find_one({"_id": order["_id"]})
+    assert stored["status"] == "filled"
+    assert stored["fill_price_usd"] == 0.9
+    assert isinstance(stored["filled_at"], datetime)
+
+
+async def test_create_paper_order_can_insert_filled_order(db_service):
+    order = await db_service.create_paper_order(
+        123, "buy", "TEST", "Mint111", 10.0, 1.0, fill_price_usd=1.1
+    )
+
+    stored = await db_service.paper_orders.find_one({"_id": order["_id"]})
+    assert stored["status"] == "filled"
+    assert stored["fill_price_usd"] == 1.1
+    assert stored["filled_at"] is not None
+    assert await db_service.get_user_paper_orders(123, status="pending") == []
+
+
+async def test_get_or_create_user_creates_missing_user(db_service):
+    user = await db_service.get_or_create_user("privy-1", tg_user_id=123, tg_username="tester")
+
+    stored = await db_service.get_user_by_privy_id("privy-1")
+    assert stored["_id"] == user["_id"]
+    assert stored["tg_user_id"] == 123
+    assert stored["tg_username"] == "tester"
+    assert await db_service.users.count_documents({}) == 1
+
+
+async def test_database_services_share_client_per_uri(db_service):
+    other = DatabaseService("mongodb://localhost:27017", "other_db")
+
+    assert other.client is db_service.client
+
+
+async def test_get_trend_change_stats(db_service):
+    assert await db_service.get_trend_change_stats(123) is None
+
+    base = datetime(2024, 1, 1)
+    logs = [
+        (["A"], True, 10.0),
+        (["A"], False, 5.0),
+        (["B"], True, 20.0),
+    ]
+    for i, (tokens, changed, minutes) in enumerate(logs):
+        doc = trend_change_document(123, [], tokens, changed, minutes)
+        doc["timestamp"] = base + timedelta(minutes=i)
+        await db_service.trend_changes.insert_one(doc)
+
+    stats = await db_service.get_trend_change_stats(123)
+
+    assert stats["count"] == 3
+    assert stats["latest_tokens"] == ["B"]
+    assert stats["avg_minutes"] == 15.0
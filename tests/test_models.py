@@ -1,22 +1,51 @@
+import re
 from datetime import datetime
 
+import pytest
+
 from solana_agent_api import models
 
-def test_user_document_sets_optional_fields():
-    doc = models.user_document(
-        privy_id="did:privy:test",
-        wallet_address="Wallet111",
-        wallet_id="wallet-id",
-        user_id="user-id",
-        tg_user_id=123,
-        tg_username="tester",
-    )
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        (
+            {
+                "wallet_address": "Wallet111",
+                "wallet_id": "wallet-id",
+                "user_id": "user-id",
+                "tg_user_id": 123,
+                "tg_username": "Tester",
+            },
+            {
+                "wallet_address": "Wallet111",
+                "wallet_id": "wallet-id",
+                "user_id": "user-id",
+                "tg_user_id": 123,
+                "tg_username": "Tester",
+                "tg_username_lower": "tester",
+            },
+        ),
+        (
+            {"wallet_address": "", "tg_user_id": 0, "tg_username": ""},
+            {
+                "wallet_address": None,
+                "wallet_id": None,
+                "user_id": None,
+                "tg_user_id": None,
+                "tg_username": None,
+            },
+        ),
+    ],
+    ids=["all-fields", "empty-fields"],
+)
+def test_user_document_sets_optional_fields(kwargs, expected):
+    doc = models.user_document(privy_id="did:privy:test", **kwargs)
     assert doc["privy_id"] == "did:privy:test"
-    assert doc["wallet_address"] == "Wallet111"
-    assert doc["wallet_id"] == "wallet-id"
-    assert doc["user_id"] == "user-id"
-    assert doc["tg_user_id"] == 123
-    assert doc["tg_username"] == "tester"
+    for key, value in expected.items():
+        assert doc[key] == value
+    assert ("tg_username_lower" in doc) == bool(kwargs["tg_username"])
+    assert doc["volume_30d"] == 0.0
     assert isinstance(doc["created_at"], datetime)
 
 
@@ -32,3 +61,10 @@ def test_payment_request_document_has_short_id():
     assert "_id" in doc
     assert len(doc["_id"]) == 10
     assert doc["status"] == "pending"
+
+
+def test_short_id_is_url_safe():
+    ids = {models.short_id() for _ in range(100)}
+    assert len(ids) == 100
+    assert all(re.fullmatch(r"[A-Za-z0-9_-]{12}", i) for i in ids)
+    assert len(models.short_id(10)) == 10
@@ -0,0 +1,159 @@
+import asyncio
+
+import httpx
+import pytest
+
+from solana_agent_api import price_service
+
+
+@pytest.fixture
+def fake_birdeye(mocked_httpx_client):
+    mocked_httpx_client.set_prices({"MintA": 1.5, "MintB": 2.0})
+    return mocked_httpx_client
+
+
+async def test_get_token_price_uses_cache(fake_birdeye):
+    assert await price_service.get_token_price("MintA") == 1.5
+    assert await price_service.get_token_price("MintA") == 1.5
+
+    assert fake_birdeye.calls == ["MintA"]
+
+
+async def test_get_token_price_refetches_after_ttl(fake_birdeye, monkeypatch):
+    await price_service.get_token_price("MintA")
+    monkeypatch.setattr(price_service, "PRICE_CACHE_TTL_SECONDS", 0.0)
+    price_service.clear_price_cache()
+
+    await price_service.get_token_price("MintA")
+    await price_service.get_token_price("MintA")
+
+    assert fake_birdeye.calls == ["MintA", "MintA", "MintA"]
+
+
+async def test_clear_price_cache(fake_birdeye):
+    await price_service.get_token_price("MintA")
+    assert "MintA" in price_service._price_cache
+
+    price_service.clear_price_cache()
+
+    assert "MintA" not in price_service._price_cache
+    await price_service.get_token_price("MintA")
+    assert fake_birdeye.calls == ["MintA", "MintA"]
+
+
+async def test_get_multiple_token_prices_uses_one_batch_request(fake_birdeye):
+    prices = await price_service.get_multiple_token_prices(["MintA", "MintB", "MintA", "Missing"])
+
+    assert prices == {"MintA": 1.5, "MintB": 2.0, "Missing": None}
+    assert fake_birdeye.batch_calls == [["MintA", "MintB", "Missing"]]
+    assert fake_birdeye.calls == []
+
+
+async def test_get_multiple_token_prices_chunks_large_batches(fake_birdeye, monkeypatch):
+    monkeypatch.setattr(price_service, "MULTI_PRICE_BATCH_SIZE", 2)
+
+    prices = await price_service.get_multiple_token_prices(["MintA", "MintB", "MintC"])
+
+    assert prices == {"MintA": 1.5, "MintB": 2.0, "MintC": None}
+    assert fake_birdeye.batch_calls == [["MintA", "MintB"], ["MintC"]]
+
+
+async def test_get_multiple_token_prices_fetches_batches_concurrently(monkeypatch):
+    mints = ["MintA", "MintB", "MintC"]
+    started = []
+    all_started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def blocking_batch(batch):
+        started.extend(batch)
+        if len(started) == len(mints):
+            all_started.set()
+        await release.wait()
+        return {mint: 1.0 for mint in batch}
+
+    monkeypatch.setattr(price_service, "MULTI_PRICE_BATCH_SIZE", 1)
+    monkeypatch.setattr(price_service, "_fetch_multi_price", blocking_batch)
+    task = asyncio.create_task(price_service.get_multiple_token_prices(mints))
+
+    # Every batch request must be in flight before any of them is allowed to finish
+    await asyncio.wait_for(all_started.wait(), timeout=1)
+    assert sorted(started) == mints
+    release.set()
+
+    assert await task == {mint: 1.0 for mint in mints}
+
+
+async def test_get_multiple_token_prices_reuses_cache(fake_birdeye):
+    await price_service.get_token_price("MintA")
+
+    prices = await price_service.get_multiple_token_prices(["MintA", "MintB", "unknown"])
+
+    assert prices == {"MintA": 1.5, "MintB": 2.0, "unknown": None}
+    assert fake_birdeye.batch_calls == [["MintB"]]
+    assert "MintB" in price_service._price_cache
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        {"status_code": 429},
+        {"json_body": {"success": False}},
+        {"exc": httpx.ReadTimeout("timed out")},
+    ],
+    ids=["rate-limited", "unsuccessful", "timeout"],
+)
+async def test_get_multiple_token_prices_returns_none_on_failure(mocked_httpx_client, response):
+    mocked_httpx_client.set_response(**response)
+
+    prices = await price_service.get_multiple_token_prices(["MintA", "MintB"])
+
+    assert prices == {"MintA": None, "MintB": None}
+    assert price_service._price_cache == {}
+
+
+async def test_price_cache_prunes_expired_entries_on_write(fake_birdeye, monkeypatch):
+    monkeypatch.setattr(price_service, "PRICE_CACHE_TTL_SECONDS", 0.0)
+    await price_service.get_token_price("MintA")
+    monkeypatch.setattr(price_service, "PRICE_CACHE_TTL_SECONDS", 30.0)
+
+    await price_service.get_token_price("MintB")
+
+    assert list(price_service._price_cache) == ["MintB"]
+
+
+async def test_get_token_price_reuses_shared_client(fake_birdeye):
+    await price_service.get_token_price("MintA")
+    await price_service.get_token_price("MintB")
+
+    assert price_service._get_http_client() is fake_birdeye
+    assert fake_birdeye.calls == ["MintA", "MintB"]
+
+
+async def test_get_token_price_parses_birdeye_response(mocked_httpx_client):
+    mocked_httpx_client.set_response(json_body={"success": True, "data": {"value": "150.5"}})
+
+    assert await price_service.get_token_price("MintA") == 150.5
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        {"status_code": 500},
+        {"json_body": {"success": False}},
+        {"json_body": {"success": True, "data": {"value": None}}},
+        {"exc": httpx.ReadTimeout("timed out")},
+        {"exc": httpx.ConnectError("refused")},
+    ],
+    ids=["http-error", "unsuccessful", "no-price", "timeout", "connect-error"],
+)
+async def test_get_token_price_returns_none_without_a_price(mocked_httpx_client, response):
+    mocked_httpx_client.set_response(**response)
+
+    assert await price_service.get_token_price("MintA") is None
+    assert "MintA" not in price_service._price_cache
+
+
+async def test_get_token_price_skips_unknown_mint(mocked_httpx_client):
+    assert await price_service.get_token_price("unknown") is None
+    assert await price_service.get_token_price("") is None
+    assert mocked_httpx_client.calls == []
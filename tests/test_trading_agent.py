@@ -0,0 +1,93 @@
+from solana_agent_api import price_service
+from solana_agent_api.trading_agent import TradingAgent
+
+
+class _RecordingAgent:
+    """Stand-in for SolanaAgent that records prompts and streams a fixed reply."""
+
+    def __init__(self, reply: str = '{"price_usd": 0}'):
+        self.reply = reply
+        self.prompts = []
+
+    async def process(self, user_id, prompt):
+        self.prompts.append(prompt)
+        yield self.reply
+
+
+async def test_check_paper_fills_prices_mints_in_one_batch(db_service, monkeypatch):
+    buy = await db_service.create_paper_order(1, "buy", "AAA", "MintA", 10.0, 2.0)
+    resting = await db_service.create_paper_order(2, "buy", "AAA", "MintA", 10.0, 1.0)
+    sell = await db_service.create_paper_order(3, "sell", "BBB", "MintB", 10.0, 5.0)
+
+    batch_calls = []
+
+    async def fake_prices(mints):
+        batch_calls.append(list(mints))
+        return {"MintA": 1.5, "MintB": 6.0}
+
+    async def unexpected_single_price(mint):
+        raise AssertionError(f"per-token price lookup for {mint}")
+
+    monkeypatch.setattr(price_service, "get_multiple_token_prices", fake_prices)
+    monkeypatch.setattr(price_service, "get_token_price", unexpected_single_price)
+    agent = _RecordingAgent()
+
+    await TradingAgent(agent, db_service)._check_paper_fills()
+
+    assert len(batch_calls) == 1
+    assert set(batch_calls[0]) == {"MintA", "MintB"}
+    assert agent.prompts == []
+    statuses = {
+        order["_id"]: order["status"]
+        for order in await db_service.paper_orders.find({}).to_list(length=None)
+    }
+    assert statuses == {buy["_id"]: "filled", resting["_id"]: "pending", sell["_id"]: "filled"}
+
+
+async def test_check_paper_fills_sends_one_multi_price_request(db_service, mocked_httpx_client):
+    await db_service.create_paper_order(1, "buy", "AAA", "MintA", 10.0, 2.0)
+    await db_service.create_paper_order(2, "buy", "AAA", "MintA", 10.0, 1.0)
+    await db_service.create_paper_order(3, "sell", "BBB", "MintB", 10.0, 5.0)
+    mocked_httpx_client.set_prices({"MintA": 1.5, "MintB": 6.0})
+    agent = _RecordingAgent()
+
+    await TradingAgent(agent, db_service)._check_paper_fills()
+
+    assert len(mocked_httpx_client.batch_calls) == 1
+    assert sorted(mocked_httpx_client.batch_calls[0]) == ["MintA", "MintB"]
+    assert mocked_httpx_client.calls == []
+    assert agent.prompts == []
+
+
+async def test_check_paper_fills_falls_back_to_agent_for_symbol_only_orders(db_service, monkeypatch):
+    order = await db_service.create_paper_order(1, "buy", "AAA", "", 10.0, 2.0)
+
+    async def fake_prices(mints):
+        assert list(mints) == []
+        return {}
+
+    monkeypatch.setattr(price_service, "get_multiple_token_prices", fake_prices)
+    agent = _RecordingAgent('{"price_usd": 1.5}')
+
+    await TradingAgent(agent, db_service)._check_paper_fills()
+
+    assert len(agent.prompts) == 1
+    assert "AAA" in agent.prompts[0]
+    stored = await db_service.paper_orders.find_one({"_id": order["_id"]})
+    assert stored["status"] == "filled"
+
+
+async def test_gather_context_keeps_gems_when_open_orders_fail(db_service, monkeypatch):
+    await db_service.create_user("privy-1", tg_user_id=1)
+    user = await db_service.get_user_by_tg_id(1)
+
+    async def failing_orders(tg_user_id, status=None):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(db_service, "get_user_paper_orders", failing_orders)
+    agent = _RecordingAgent('{"gems": [{"token": "AAA"}]}')
+
+    context = await TradingAgent(agent, db_service)._gather_context(user, "Wallet111", [])
+
+    assert context["open_orders"] == []
+    assert context["gems"] == {"gems": [{"token": "AAA"}]}